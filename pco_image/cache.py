@@ -0,0 +1,73 @@
+"""Sidecar cache of decoded image indices and timestamps.
+
+The cache is stored next to the images of a directory in a file named
+`CACHE_FILENAME`. Entries are keyed by file name and the 2-bit-shift flag
+used for decoding and store modification time and size of the file, so
+changed files are decoded again.
+"""
+
+import os
+import pathlib
+import tempfile
+import zipfile
+from datetime import datetime
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+CACHE_FILENAME = '.pco_idx.npz'
+
+# (file name, shift2bits) -> (mtime_ns, size, image index, timestamp)
+Cache = Dict[Tuple[str, bool], Tuple[int, int, int, datetime]]
+
+
+def load_cache(directory: Union[str, pathlib.Path]) -> Cache:
+    """Load the cache of `directory`. Returns an empty cache if there is none
+    or if it cannot be read."""
+    try:
+        with np.load(pathlib.Path(directory) / CACHE_FILENAME, allow_pickle=False) as npz:
+            return {(str(name), bool(shift2bits)): (int(mtime_ns), int(size), int(idx), dtime.item())
+                    for name, shift2bits, mtime_ns, size, idx, dtime in zip(npz['name'],
+                                                                            npz['shift2bits'],
+                                                                            npz['mtime_ns'],
+                                                                            npz['size'],
+                                                                            npz['idx'],
+                                                                            npz['dtime'])}
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+        return {}
+
+
+def save_cache(directory: Union[str, pathlib.Path], cache: Cache) -> None:
+    """Atomically write the cache of `directory`"""
+    directory = pathlib.Path(directory)
+    keys = list(cache)
+    values = [cache[key] for key in keys]
+    fd, tmp_filename = tempfile.mkstemp(prefix=CACHE_FILENAME, suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f,
+                     name=np.array([name for name, _ in keys], dtype=str),
+                     shift2bits=np.array([shift2bits for _, shift2bits in keys], dtype=bool),
+                     mtime_ns=np.array([v[0] for v in values], dtype=np.int64),
+                     size=np.array([v[1] for v in values], dtype=np.int64),
+                     idx=np.array([v[2] for v in values], dtype=np.int64),
+                     dtime=np.array([v[3] for v in values], dtype='datetime64[us]'))
+        os.replace(tmp_filename, directory / CACHE_FILENAME)
+    except BaseException:
+        os.unlink(tmp_filename)
+        raise
+
+
+def lookup(cache: Cache, filename: pathlib.Path, shift2bits: bool,
+           stat: os.stat_result) -> Optional[Tuple[int, datetime]]:
+    """Return (image index, timestamp) of `filename` if cached and up to date"""
+    entry = cache.get((filename.name, shift2bits))
+    if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+        return None
+    return entry[2], entry[3]
+
+
+def update(cache: Cache, filename: pathlib.Path, shift2bits: bool,
+           stat: os.stat_result, idx: int, dtime: datetime) -> None:
+    """Add or replace the entry of `filename`"""
+    cache[(filename.name, shift2bits)] = (stat.st_mtime_ns, stat.st_size, idx, dtime)
@@ -2,3 +2,6 @@
 # set ENHANCED_READING to True to make use of it:
 ENHANCED_READING = True
 B16_HEADER_SIZE = 488
+# number of bytes read at least when reading the stamp pixels of a b16 file.
+# As headers are typically smaller, the stamp pixels are found by a single read:
+B16_HEADER_READ_SIZE = 2048
@@ -3,17 +3,31 @@ It allows to read the image index and timestamp from the first 14 pixels. For th
 timestamp" must be set in the PCO software.
 """
 
+import importlib.util
+import os
 import pathlib
 import struct
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from enum import Enum
-from typing import Tuple, Union, List
+from functools import lru_cache
+from typing import Tuple, Union, List, Optional, Iterable, Iterator
 
 import cv2
 import numpy as np
 from pco_tools import pco_reader
 
-from . import config
+from . import cache, config
+
+# numba is optional and only imported (and the kernel compiled) on first use:
+_USE_NUMBA = importlib.util.find_spec('numba') is not None
+_decode_stamp_jit = None
+
+try:
+    import tifffile
+except ImportError:
+    tifffile = None
 
 
 class SourceType(Enum):
@@ -23,33 +37,263 @@ class SourceType(Enum):
     nparray = 3
 
 
+@lru_cache(maxsize=8)
+def _suffix_to_stype(suffix: str) -> SourceType:
+    """source type of a file suffix (without dot)"""
+    return SourceType[suffix]
+
+
+def _bcd_nibbles(pixels, shift2bits: bool) -> np.ndarray:
+    """split BCD-encoded pco-pixel values into their two (decimal) digits
+
+    Returns a uint8 array of twice the length of `pixels` (along the last
+    axis) holding the high and low nibble of each pixel in alternating order.
+    """
+    pixels = np.asarray(pixels, dtype=np.uint16)
+    if shift2bits:
+        pixels = pixels >> 2
+    digits = np.empty(pixels.shape[:-1] + (2 * pixels.shape[-1],), dtype=np.uint8)
+    digits[..., 0::2] = (pixels >> 4) & 0xF
+    digits[..., 1::2] = pixels & 0xF
+    return digits
+
+
+def _bcd_table(size: int, shift2bits: bool) -> np.ndarray:
+    """lookup table mapping every pixel value below `size` to its two BCD digits (as ASCII bytes)"""
+    return np.frombuffer((_bcd_nibbles(np.arange(size), shift2bits=shift2bits) + ord('0')).tobytes(), dtype='S2')
+
+
+# only the lower 10 (2 bit shift) respectively 8 bits of a pixel hold the BCD value:
+_BCD_TABLE_SHIFT = _bcd_table(1024, shift2bits=True)
+_BCD_TABLE = _bcd_table(256, shift2bits=False)
+_BCD_TABLES = {True: _BCD_TABLE_SHIFT, False: _BCD_TABLE}
+
+
 def bcd2digits(bcd_pixel: int, shift2bits: bool) -> str:
     """convert a BCD-encoded pco-pixel value into two digits"""
     if shift2bits:
-        binary_string = bin(bcd_pixel)[2:].zfill(10)[:-2]
-        digit1, digit2 = binary_string[0:4], binary_string[4:]
-        return f'{int(digit1, 2)}{int(digit2, 2)}'
-    binary_string = bin(bcd_pixel)[2:].zfill(8)
-    digit1, digit2 = binary_string[0:4], binary_string[4:]
-    return f'{int(digit1, 2)}{int(digit2, 2)}'
+        bcd_pixel >>= 2
+    return f'{(bcd_pixel >> 4) & 0xF}{bcd_pixel & 0xF}'
+
+
+# the first six uint32 of a b16 file, the third one is the header size:
+_HDR_STRUCT = struct.Struct('<6L')
+# only the header size, located at byte offset 8:
+_HDR_SIZE_STRUCT = struct.Struct('<L')
+
+# magic number of b16 files (string 'PCO-'):
+_PCO_STRING = 0x2d4f4350
+
+_O_RDONLY = os.O_RDONLY | getattr(os, 'O_BINARY', 0)
+
+if hasattr(os, 'pread'):
+    _pread = os.pread
+else:
+    def _pread(fd: int, n: int, offset: int) -> bytes:
+        """`os.pread` replacement for platforms not providing it (Windows)"""
+        os.lseek(fd, offset, os.SEEK_SET)
+        return os.read(fd, n)
+
+# end positions (exclusive) of the index, year, month, day, hour, minute, second
+# and sub-second field within the decoded digits. Only the first four sub-second
+# digits are used, the resolution of the timestamp therefore is 100 µs:
+_STAMP_FIELD_ENDS = (8, 12, 14, 16, 18, 20, 22, 26)
+# pixels needed for a complete date and time with at least one sub-second digit:
+_MIN_STAMP_PIXELS = _STAMP_FIELD_ENDS[-2] // 2 + 1
+
+
+def _decode_stamp(pixels, shift2bits):
+    """decode the stamp pixels into the integer fields defined by `_STAMP_FIELD_ENDS`
+
+    Returns the fields and the number of successfully decoded digits. Decoding
+    stops at the first nibble that is not a decimal digit.
+    """
+    fields = np.zeros(8, dtype=np.int64)
+    n_digits = min(2 * pixels.shape[0], _STAMP_FIELD_ENDS[-1])
+    field = 0
+    for i in range(n_digits):
+        px = pixels[i // 2]
+        if shift2bits:
+            px = px >> 2
+        if i % 2 == 0:
+            digit = (px >> 4) & 0xF
+        else:
+            digit = px & 0xF
+        if digit > 9:
+            return fields, i
+        while i >= _STAMP_FIELD_ENDS[field]:
+            field += 1
+        fields[field] = fields[field] * 10 + digit
+    return fields, n_digits
+
+
+def _jit_decode_stamp():
+    """`_decode_stamp` compiled with numba. Returns None (and disables the
+    numba path) if numba cannot be imported or fails to compile the kernel."""
+    global _decode_stamp_jit, _USE_NUMBA
+    if _decode_stamp_jit is None:
+        try:
+            from numba import njit
+            kernel = njit(cache=True)(_decode_stamp)
+            # compile now rather than on the first real call:
+            for shift2bits in (False, True):
+                kernel(np.zeros(_STAMP_FIELD_ENDS[-1] // 2, dtype=np.uint16), shift2bits)
+        except Exception:  # ImportError or any numba error
+            _USE_NUMBA = False
+            return None
+        _decode_stamp_jit = kernel
+    return _decode_stamp_jit
+
+
+def _stamp_error(reason) -> ValueError:
+    return ValueError('Could not convert the timestamp to an datetime object.'
+                      'Reason may be that there is no '
+                      'timestamp written to the first `n_pixels` pixels or that `n_pixels` is '
+                      f'too long (it is typically 14 or 16) or too small (at least {_MIN_STAMP_PIXELS}). '
+                      'Consider calling .get_timestamp(True), because the original dat may be 14 bit '
+                      'but are scaled to 16 bit in which case the decoding needs a small tweak. '
+                      f'Orig. error: {reason}')
+
+
+@lru_cache(maxsize=None)
+def _stamp_field_weights(n_digits: int) -> Tuple[np.ndarray, np.ndarray]:
+    """decimal weight of every digit within its stamp field and the start position of the fields"""
+    starts = [start for start in (0,) + _STAMP_FIELD_ENDS[:-1] if start < n_digits]
+    ends = [min(end, n_digits) for end in _STAMP_FIELD_ENDS[:len(starts)]]
+    weights = np.array([10 ** (end - i - 1) for start, end in zip(starts, ends) for i in range(start, end)],
+                       dtype=np.int64)
+    return weights, np.array(starts)
+
+
+def _stamp_fields(digits: np.ndarray) -> np.ndarray:
+    """accumulate decimal digits (along the last axis) to the fields defined by `_STAMP_FIELD_ENDS`"""
+    weights, starts = _stamp_field_weights(digits.shape[-1])
+    return np.add.reduceat(digits * weights, starts, axis=-1)
+
+
+def _build_stamp(fields, n_digits: int):
+    """build image index and timestamp from the fields defined by `_STAMP_FIELD_ENDS`"""
+    n_subsecond = n_digits - _STAMP_FIELD_ENDS[-2]
+    if n_subsecond < 1:
+        raise _stamp_error(f'Only {n_digits} valid digits found')
+    idx, year, month, day, hour, minute, second, subsecond = (int(f) for f in fields)
+    try:
+        dtime = datetime(year, month, day, hour, minute, second,
+                         subsecond * 10 ** (6 - n_subsecond))
+    except ValueError as e:
+        raise _stamp_error(e)
+    return idx, dtime
 
 
 def get_stamp_from_16pixels(pixels, shift2bits: bool, return_raw=False):
     """Get image index and timestamp from pixels"""
-    full_string = ''.join([bcd2digits(px, shift2bits=shift2bits) for px in pixels])
+    kernel = _jit_decode_stamp() if _USE_NUMBA and not return_raw else None
+    if kernel is not None:
+        pixels = np.ascontiguousarray(pixels, dtype=np.uint16)
+        fields, n_digits = kernel(pixels, shift2bits)
+        if n_digits < min(2 * len(pixels), _STAMP_FIELD_ENDS[-1]):
+            raise _stamp_error(f'Invalid BCD digit at position {n_digits}')
+        return _build_stamp(fields, n_digits)
+
     if return_raw:
+        table = _BCD_TABLES[shift2bits]
+        full_string = table[np.asarray(pixels, dtype=np.intp) & (len(table) - 1)].tobytes().decode('ascii')
         return full_string[0:8], full_string[8:]
+
+    digits = _bcd_nibbles(pixels, shift2bits=shift2bits)[:_STAMP_FIELD_ENDS[-1]]
+    invalid = np.flatnonzero(digits > 9)
+    if invalid.size:
+        raise _stamp_error(f'Invalid BCD digit at position {invalid[0]}')
+    return _build_stamp(_stamp_fields(digits), len(digits))
+
+
+def get_stamps_from_pixels(pixels: np.ndarray, shift2bits: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Get image indices and timestamps of many images at once
+
+    Parameters
+    ----------
+    pixels: np.ndarray
+        (N, n_pixels) array of the stamp pixels of N images.
+    shift2bits: bool
+        Shift the data by 2 bits in order to convert 16bit to 14 bit.
+
+    Returns
+    -------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        Image indices (int64), timestamps (datetime64[us]) and a boolean
+        array, which is False for images without a valid stamp. Index and
+        timestamp of these images are undefined.
+    """
+    digits = _bcd_nibbles(pixels, shift2bits=shift2bits)[:, :_STAMP_FIELD_ENDS[-1]]
+    n_digits = digits.shape[1]
+    n_subsecond = n_digits - _STAMP_FIELD_ENDS[-2]
+    if n_subsecond < 1:
+        raise _stamp_error(f'Only {n_digits} digits available')
+    idx, year, month, day, hour, minute, second, subsecond = _stamp_fields(digits).T
+
+    months = (year - 1970) * 12 + (month - 1)
+    month_start = months.astype('datetime64[M]').astype('datetime64[D]')
+    days_in_month = ((months + 1).astype('datetime64[M]').astype('datetime64[D]') - month_start).astype(np.int64)
+    valid = ((digits <= 9).all(axis=1)
+             & (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= days_in_month)
+             & (hour < 24) & (minute < 60) & (second < 60))
+    microseconds = ((((day - 1) * 24 + hour) * 60 + minute) * 60 + second) * 10 ** 6 \
+                   + subsecond * 10 ** (6 - n_subsecond)
+    return idx, month_start + microseconds.astype('timedelta64[us]'), valid
+
+
+def _load_b16(filename) -> np.ndarray:
+    """read the image data of a b16 file
+
+    Only header and pixel block are read, directly into a (writable) array,
+    and the file is closed afterwards. Falls back to `pco_reader.load` if
+    the header is not understood.
+    """
+    with open(filename, 'rb') as f:
+        header = f.read(_HDR_STRUCT.size)
+        if len(header) < _HDR_STRUCT.size:
+            return pco_reader.load(filename)
+        magic, _, header_size, width, height, _ = _HDR_STRUCT.unpack(header)
+        if magic != _PCO_STRING:
+            return pco_reader.load(filename)
+        f.seek(header_size)
+        img = np.fromfile(f, dtype=np.dtype('<u2'), count=width * height)
+    if img.size < width * height:
+        return pco_reader.load(filename)
+    return img.reshape(height, width)
+
+
+def _flat_pixels(img: np.ndarray, start: int, stop: int) -> np.ndarray:
+    """pixels `start` to `stop` of the flattened image
+
+    A view for C-contiguous images, otherwise only the requested pixels are copied.
+    """
+    if img.flags.c_contiguous:
+        return img.reshape(-1)[start:stop]
+    return img.flat[start:stop]
+
+
+def _read_tiff_pixels(filename, stop: int) -> Optional[np.ndarray]:
+    """read the first `stop` pixels of a single-channel tiff file by
+    decoding only its first strip
+
+    Returns None if `tifffile` is not installed or the file layout or
+    compression is not supported, e.g. the codec is not available.
+    """
+    if tifffile is None:
+        return None
     try:
-        dtime = datetime.strptime(full_string[8:26], "%Y%m%d%H%M%S%f")
-    except ValueError as e:
-        raise ValueError('Could not convert the timestamp to an datetime object.'
-                         'Reason may be that there is no '
-                         'timestamp written to the first `n_pixels` pixels or that `n_pixels` is '
-                         'too long (it is typically 14 or 16) or too small (at least 10). '
-                         'Consider calling .get_timestamp(True), because the original dat may be 14 bit '
-                         'but are scaled to 16 bit in which case the decoding needs a small tweak. '
-                         f'Orig. error: {e}')
-    return int(full_string[0:8]), dtime
+        with tifffile.TiffFile(filename) as tf:
+            page = tf.pages[0]
+            if page.is_tiled or page.samplesperpixel != 1:
+                return None
+            tf.filehandle.seek(page.dataoffsets[0])
+            segment, _, _ = page.decode(tf.filehandle.read(page.databytecounts[0]), 0)
+    except ValueError:
+        return None
+    if segment.size < stop:
+        return None
+    return segment.reshape(-1)[:stop]
 
 
 class PCOImage:
@@ -63,12 +307,19 @@ class PCOImage:
     `img` the image then is NOT reloaded! If the image has
     changed, call `load_image` to reload the image.
     """
+    # many instances may exist at once (one per file), slots save their memory:
+    __slots__ = ('stype', '_filename', '_img', '_img_stamp', '_idx', '_dtime',
+                 '_n_pixels', 'timestamp_type', '_return_raw', '__weakref__')
+
+    # library used to read full tiff images, 'cv2' or 'tifffile' (if installed):
+    TIFF_BACKEND: str = 'cv2'
 
     def __init__(self,
                  filename: Union[str, pathlib.Path, None],
                  n_pixels: int = 14,
                  timestamp_type='datetime',
-                 stype: SourceType = None):
+                 stype: SourceType = None,
+                 check_exists: bool = True):
         """Int a PCOImage object.
 
         Parameters
@@ -77,7 +328,8 @@ class PCOImage:
             Filename. Can be None. Obviously, function load() will not work.
             Thus, this is only reasonable if the file is initialized from an
             array (.from_array()).
-            If a filename is provided (str or pathlib.Path), existence is checked.
+            If a filename is provided (str or pathlib.Path), existence is checked
+            unless `check_exists` is False.
         n_pixels: int=14
             Number of pixels to read from the image to get the timestamp and
             image index. This is typically 14 for tested PCO cameras.
@@ -88,6 +340,10 @@ class PCOImage:
         stype: SourceType=None
             Type of the image file. If None, the type is inferred from the
             filename suffix. If not None, the type is set to this value.
+        check_exists: bool=True
+            Check that the file exists. Skipping the check saves a stat call
+            per file if the filenames are known to exist, e.g. are results
+            of a directory listing.
 
         Returns
         -------
@@ -96,17 +352,15 @@ class PCOImage:
 
         """
         self.stype = stype
-        if filename is None:
-            self.filename = None
-        else:
-            self.filename = pathlib.Path(filename)
-            if not self.filename.exists():
+        # the pathlib.Path object is only created when `filename` is accessed:
+        self._filename = filename
+        if filename is not None:
+            if check_exists and not os.path.exists(filename):
                 raise FileNotFoundError(f'File not found: {self.filename.resolve().absolute()}')
             if self.stype is None:
                 # get from image
-                self.stype = SourceType.__getitem__(self.filename.suffix[1:])
-            else:
-                self.stype = stype
+                filename = os.fspath(filename)
+                self.stype = _suffix_to_stype(filename[filename.rfind('.') + 1:])
         self._img = None
         self._img_stamp = None
         self._idx = None
@@ -115,6 +369,17 @@ class PCOImage:
         self.timestamp_type = timestamp_type
         self._return_raw = timestamp_type != 'datetime'
 
+    @property
+    def filename(self) -> Optional[pathlib.Path]:
+        """Image filename"""
+        if self._filename is not None and not isinstance(self._filename, pathlib.Path):
+            self._filename = pathlib.Path(self._filename)
+        return self._filename
+
+    @filename.setter
+    def filename(self, filename: Union[str, pathlib.Path, None]) -> None:
+        self._filename = filename
+
     def __repr__(self):
         return f'<{self.__class__.__name__} {self.filename}>'
 
@@ -158,6 +423,34 @@ class PCOImage:
             img._img = self.img / other.img
         return img
 
+    def _inplace(self, ufunc, other) -> "PCOImage":
+        """apply `ufunc` in-place on the image. The result is cast to the dtype
+        of the image, i.e. unlike for the binary operators, no type promotion
+        takes place."""
+        if not self.img.flags.writeable:
+            self._img = self._img.copy()
+        other = other if isinstance(other, (int, float)) else other.img
+        ufunc(self._img, other, out=self._img, casting='unsafe')
+        return self
+
+    def __iadd__(self, other):
+        """Add an image or a number in-place"""
+        return self._inplace(np.add, other)
+
+    def __isub__(self, other):
+        """Subtract an image or a number in-place"""
+        return self._inplace(np.subtract, other)
+
+    def __imul__(self, other):
+        """Multiply by an image or a number in-place"""
+        return self._inplace(np.multiply, other)
+
+    def __itruediv__(self, other):
+        """Divide by an image or a number in-place. For integer images the
+        result is truncated, call `.img.astype(np.float32)` beforehand to keep
+        fractions."""
+        return self._inplace(np.true_divide, other)
+
     @property
     def img(self) -> "np.ndarray":
         """Return img as np.ndarray"""
@@ -211,18 +504,51 @@ class PCOImage:
         pco_img._img = array
         return pco_img
 
+    @staticmethod
+    def empty_like(img: Union["PCOImage", np.ndarray], n_pixels=14, timestamp_type='datetime') -> "PCOImage":
+        """init with an uninitialized buffer of the shape and dtype of `img`,
+        e.g. as target for in-place operations
+
+        Parameters
+        ----------
+        img: PCOImage or np.ndarray
+            The image providing shape and dtype.
+        n_pixels: int=14
+            Number of pixels to read from the image to get the timestamp and
+            image index.
+        timestamp_type: str='datetime'
+            Type of the timestamp. Can be 'datetime' or 'str'.
+
+        Returns
+        -------
+        PCOImage
+            The PCOImage object.
+        """
+        if isinstance(img, PCOImage):
+            img = img.img
+        return PCOImage.from_array(np.empty_like(img), n_pixels=n_pixels, timestamp_type=timestamp_type)
+
     def info(self):
         """call `pco_reader.info`"""
         if self.stype == SourceType.b16:
             return pco_reader.info(self.filename)
         raise ValueError('Info only available for .b16-images')
 
+    def _imread_tiff(self) -> "np.ndarray":
+        """read the (first page of the) tiff file with the `TIFF_BACKEND` library"""
+        if self.TIFF_BACKEND == 'tifffile' and tifffile is not None:
+            try:
+                return tifffile.imread(self._filename, key=0)
+            except ValueError:
+                pass  # e.g. codec not available
+        return cv2.imdecode(np.fromfile(self._filename, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+
     def load_image(self) -> "np.ndarray":
         """Reads image and overwrites object variable `_img`"""
         if self.stype == SourceType.b16:
-            self._img = pco_reader.load(self.filename)
+            self._img = _load_b16(self.filename)
         elif self.stype == SourceType.tiff:
-            self._img = cv2.imread(str(self.filename), cv2.IMREAD_UNCHANGED)
+            self._img = self._imread_tiff()
         return self._img
 
     def write(self, filename: Union[str, pathlib.Path, None]) -> Tuple[bool, pathlib.Path]:
@@ -234,29 +560,43 @@ class PCOImage:
     def get_pixels(self, stop, start=0) -> "np.ndarray":
         """return the pixels from `start` to `stop`"""
         if self._img is not None:
-            return self._img.ravel()[start:stop]
+            return _flat_pixels(self._img, start, stop)
 
         if self.stype == SourceType.tiff:
-            self._img = cv2.imread(str(self.filename), cv2.IMREAD_UNCHANGED)
-            return self._img.ravel()[start:stop]
+            pixels = _read_tiff_pixels(self._filename, stop)
+            if pixels is not None:
+                return pixels[start:stop]
+            self._img = self._imread_tiff()
+            return _flat_pixels(self._img, start, stop)
 
         if not config.ENHANCED_READING:
-            return self.img.ravel()[start:stop]
+            return _flat_pixels(self.img, start, stop)
 
+        # the header size of the last file read is a good guess for the
+        # next one. Reading at least `config.B16_HEADER_READ_SIZE` bytes, a
+        # second read is only needed for unusually large headers:
         header_size = config.B16_HEADER_SIZE
-        found_header_size = False
-        while not found_header_size:
-            with open(self.filename, 'rb') as f:
-                buf = f.read(header_size + stop * 2)
-                actual_header_size = struct.unpack_from('<' + 'L' * 6, buf)[2]
-                if actual_header_size != header_size:
-                    header_size = actual_header_size
-                    config.B16_HEADER_SIZE = actual_header_size
-                else:
-                    found_header_size = True
-
-        data = buf[header_size:header_size + (stop * 2)]
-        return np.frombuffer(data, dtype=np.dtype('<u2'))[start:stop]
+        fd = os.open(self._filename, _O_RDONLY)
+        try:
+            buf = _pread(fd, max(config.B16_HEADER_READ_SIZE, header_size) + stop * 2, 0)
+            header_size, = _HDR_SIZE_STRUCT.unpack_from(buf, 8)
+            if header_size + stop * 2 > len(buf):
+                buf = _pread(fd, header_size + stop * 2, 0)
+        finally:
+            os.close(fd)
+        config.B16_HEADER_SIZE = header_size
+
+        return np.frombuffer(buf, dtype=np.dtype('<u2'), count=stop, offset=header_size)[start:stop]
+
+    def _read_stamp(self, shift2bits: bool) -> None:
+        """decode image index and timestamp, failing before any reading if
+        `n_pixels` is too small to hold a timestamp"""
+        if not self._return_raw and self._n_pixels < _MIN_STAMP_PIXELS:
+            raise _stamp_error(f'n_pixels={self._n_pixels} is too small, at least '
+                               f'{_MIN_STAMP_PIXELS} pixels are required')
+        self._idx, self._dtime = get_stamp_from_16pixels(self.get_pixels(self._n_pixels),
+                                                         shift2bits=shift2bits,
+                                                         return_raw=self._return_raw)
 
     def get_index(self, shift2bits: bool = True) -> int:
         """return image index
@@ -268,9 +608,7 @@ class PCOImage:
             This is needed if original data is 14 bit was saved to 16 bit
         """
         if self._idx is None:
-            self._idx, self._dtime = get_stamp_from_16pixels(self.get_pixels(self._n_pixels),
-                                                             shift2bits=shift2bits,
-                                                             return_raw=self._return_raw)
+            self._read_stamp(shift2bits)
         return self._idx
 
     def get_timestamp(self, shift2bits: bool = True) -> datetime:
@@ -283,15 +621,207 @@ class PCOImage:
             This is needed if original data is 14 bit was saved to 16 bit
         """
         if self._dtime is None:
-            self._idx, self._dtime = get_stamp_from_16pixels(self.get_pixels(stop=self._n_pixels),
-                                                             shift2bits=shift2bits,
-                                                             return_raw=self._return_raw)
+            self._read_stamp(shift2bits)
         return self._dtime
 
 
-def get_timesteps(filenames: List[Union[str, pathlib.Path]], shift2bits: bool = True) -> List:
-    """get timestep from multiple files and return as list"""
-    ts = []
-    for filename in filenames:
-        ts.append(PCOImage(filename).get_timestamp(shift2bits=shift2bits))
-    return ts
+# fields of the array returned by `get_stamps`
+STAMP_DTYPE = np.dtype([('filename', object), ('idx', np.int64), ('dtime', 'datetime64[us]')])
+
+
+def _n_workers(workers: Optional[int]) -> int:
+    """number of reader threads, defaults to min(32, 4 * number of CPUs)"""
+    if workers is None:
+        return min(32, (os.cpu_count() or 4) * 4)
+    return workers
+
+
+def _read_stamp_pixels(filenames: List[Union[str, pathlib.Path]],
+                       n_pixels: int,
+                       workers: Optional[int],
+                       check_exists: bool = True) -> np.ndarray:
+    """read the stamp pixels of multiple files into one (N, n_pixels) array using a thread pool"""
+    pixels = np.empty((len(filenames), n_pixels), dtype=np.uint16)
+
+    def _read_pixels(i):
+        pixels[i] = PCOImage(filenames[i], n_pixels=n_pixels, check_exists=check_exists).get_pixels(n_pixels)
+
+    workers = _n_workers(workers)
+    if workers == 1:
+        for i in range(len(filenames)):
+            _read_pixels(i)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(_read_pixels, range(len(filenames))))
+    return pixels
+
+
+def _read_stamps(filenames: List[Union[str, pathlib.Path]],
+                 shift2bits: bool,
+                 workers: Optional[int],
+                 check_exists: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """read image indices and timestamps of multiple files"""
+    idx, dtime, valid = get_stamps_from_pixels(_read_stamp_pixels(filenames, 14, workers, check_exists),
+                                               shift2bits=shift2bits)
+    if not valid.all():
+        raise _stamp_error(f'No valid stamp found in {filenames[np.argmin(valid)]}')
+    return idx, dtime
+
+
+def _read_stamps_cached(filenames: List[Union[str, pathlib.Path]],
+                        shift2bits: bool,
+                        workers: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """like `_read_stamps` but using and updating the sidecar cache of the directories"""
+    filenames = [filename if isinstance(filename, pathlib.PurePath) else pathlib.Path(filename)
+                 for filename in filenames]
+    # normalized, so relative and absolute paths of a directory share one cache:
+    directories = [os.path.abspath(filename.parent) for filename in filenames]
+    caches = {directory: cache.load_cache(directory) for directory in set(directories)}
+    stats = [os.stat(filename) for filename in filenames]
+    idx = np.empty(len(filenames), dtype=np.int64)
+    dtime = np.empty(len(filenames), dtype='datetime64[us]')
+    missing = []
+    for i, (filename, directory, stat) in enumerate(zip(filenames, directories, stats)):
+        stamp = cache.lookup(caches[directory], filename, shift2bits, stat)
+        if stamp is None:
+            missing.append(i)
+        else:
+            idx[i], dtime[i] = stamp
+    if not missing:
+        return idx, dtime
+
+    # existence is already known from the stat calls:
+    idx[missing], dtime[missing] = _read_stamps([filenames[i] for i in missing], shift2bits, workers,
+                                                check_exists=False)
+    modified_dirs = set()
+    for i in missing:
+        cache.update(caches[directories[i]], filenames[i], shift2bits, stats[i],
+                     int(idx[i]), dtime[i].item())
+        modified_dirs.add(directories[i])
+    for directory in modified_dirs:
+        try:
+            cache.save_cache(directory, caches[directory])
+        except OSError:
+            pass  # e.g. read-only directory, the cache is only an optimization
+    return idx, dtime
+
+
+def get_timesteps(filenames: Iterable[Union[str, pathlib.Path]],
+                  shift2bits: bool = True,
+                  workers: Optional[int] = None,
+                  use_cache: bool = False,
+                  as_array: bool = False) -> Union[List, np.ndarray]:
+    """get timestep from multiple files and return as list
+
+    Parameters
+    ----------
+    filenames: Iterable[Union[str, pathlib.Path]]
+        Image filenames.
+    shift2bits: bool=True
+        Shift the data by 2 bits in order to convert 16bit to 14 bit.
+    workers: int=None
+        Number of threads reading the files concurrently. Defaults to
+        min(32, 4 * number of CPUs). Pass 1 to read the files sequentially.
+    use_cache: bool=False
+        Use and update a sidecar cache file in the image directories (see
+        `pco_image.cache`), so unchanged files are not read again on the
+        next call.
+    as_array: bool=False
+        Return a datetime64[us] array instead of a list of datetime
+        objects, which takes 8 bytes per timestamp.
+
+    Returns
+    -------
+    List or np.ndarray
+        The timestamps in the order of `filenames`.
+    """
+    filenames = list(filenames)
+    if use_cache:
+        _, dtime = _read_stamps_cached(filenames, shift2bits, workers)
+    else:
+        _, dtime = _read_stamps(filenames, shift2bits, workers)
+    if as_array:
+        return dtime
+    return dtime.tolist()
+
+
+def get_stamps(filenames: Iterable[Union[str, pathlib.Path]],
+               shift2bits: bool = True,
+               workers: Optional[int] = None,
+               use_cache: bool = False) -> np.ndarray:
+    """get image index and timestamp from multiple files as structured array
+
+    Compared to a list of `PCOImage` objects or timestamps, the columns of
+    the returned array can be processed at once, e.g.
+    `stamps[stamps['dtime'] > np.datetime64('2023-01-20T18:21')]['filename']`.
+
+    Parameters
+    ----------
+    filenames: Iterable[Union[str, pathlib.Path]]
+        Image filenames.
+    shift2bits: bool=True
+        Shift the data by 2 bits in order to convert 16bit to 14 bit.
+    workers: int=None
+        Number of threads reading the files concurrently. Defaults to
+        min(32, 4 * number of CPUs). Pass 1 to read the files sequentially.
+    use_cache: bool=False
+        Use and update a sidecar cache file in the image directories.
+
+    Returns
+    -------
+    np.ndarray
+        Array of dtype `STAMP_DTYPE` with fields 'filename', 'idx' and
+        'dtime' in the order of `filenames`.
+    """
+    filenames = list(filenames)
+    if use_cache:
+        idx, dtime = _read_stamps_cached(filenames, shift2bits, workers)
+    else:
+        idx, dtime = _read_stamps(filenames, shift2bits, workers)
+    meta = np.empty(len(filenames), dtype=STAMP_DTYPE)
+    meta['filename'] = filenames
+    meta['idx'] = idx
+    meta['dtime'] = dtime
+    return meta
+
+
+def iter_timesteps(filenames: Iterable[Union[str, pathlib.Path]],
+                   shift2bits: bool = True,
+                   prefetch: int = 64,
+                   workers: Optional[int] = None,
+                   n_pixels: int = 14) -> Iterator[datetime]:
+    """iterate over the timesteps of multiple files
+
+    While the timestamp of the current file is decoded, the stamp pixels
+    of the next `prefetch` files are already read by background threads.
+
+    Parameters
+    ----------
+    filenames: Iterable[Union[str, pathlib.Path]]
+        Image filenames.
+    shift2bits: bool=True
+        Shift the data by 2 bits in order to convert 16bit to 14 bit.
+    prefetch: int=64
+        Maximum number of files read ahead.
+    workers: int=None
+        Number of reader threads. Defaults to min(32, 4 * number of CPUs).
+    n_pixels: int=14
+        Number of pixels holding image index and timestamp.
+
+    Yields
+    ------
+    datetime
+        The timestamps in the order of `filenames`.
+    """
+
+    def _read_pixels(filename):
+        return PCOImage(filename, n_pixels=n_pixels).get_pixels(n_pixels)
+
+    with ThreadPoolExecutor(max_workers=_n_workers(workers)) as executor:
+        pending = deque()
+        for filename in filenames:
+            pending.append(executor.submit(_read_pixels, filename))
+            if len(pending) >= prefetch:
+                yield get_stamp_from_16pixels(pending.popleft().result(), shift2bits=shift2bits)[1]
+        while pending:
+            yield get_stamp_from_16pixels(pending.popleft().result(), shift2bits=shift2bits)[1]
@@ -0,0 +1,45 @@
+import os
+import pathlib
+import shutil
+import unittest
+from unittest import mock
+
+from pco_image import cache
+from pco_image.image import get_timesteps
+
+__this_dir__ = pathlib.Path(__file__).parent
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = __this_dir__ / 'cache_dir'
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        self.cache_dir.mkdir()
+        self.addCleanup(shutil.rmtree, self.cache_dir, ignore_errors=True)
+        for i in range(1, 3):
+            shutil.copy(__this_dir__ / 'Cam1_0001A.b16', self.cache_dir / f'img_{i}.b16')
+
+    def test_corrupt_cache(self):
+        (self.cache_dir / cache.CACHE_FILENAME).write_bytes(b'no zip file')
+        self.assertEqual(cache.load_cache(self.cache_dir), {})
+        (self.cache_dir / cache.CACHE_FILENAME).write_bytes(b'')
+        self.assertEqual(cache.load_cache(self.cache_dir), {})
+
+        ts = get_timesteps(sorted(self.cache_dir.glob('*.b16')), use_cache=True)
+        self.assertEqual(len(ts), 2)
+        self.assertEqual(len(cache.load_cache(self.cache_dir)), 2)
+
+    def test_not_writable(self):
+        with mock.patch('tempfile.mkstemp', side_effect=PermissionError('read-only')):
+            ts = get_timesteps(sorted(self.cache_dir.glob('*.b16')), use_cache=True)
+        self.assertEqual(len(ts), 2)
+        self.assertFalse((self.cache_dir / cache.CACHE_FILENAME).exists())
+
+    def test_relative_and_absolute_paths(self):
+        cwd = os.getcwd()
+        os.chdir(self.cache_dir)
+        self.addCleanup(os.chdir, cwd)
+        get_timesteps(['img_1.b16', self.cache_dir.absolute() / 'img_2.b16'], use_cache=True)
+        self.assertEqual(sorted(name for name, _ in cache.load_cache(self.cache_dir)),
+                         ['img_1.b16', 'img_2.b16'])
@@ -2,6 +2,8 @@ import datetime
 import pathlib
 import time
 import unittest
+import weakref
+from unittest import mock
 
 import numpy as np
 
@@ -17,6 +19,55 @@ class TestPCOImage(unittest.TestCase):
         self.assertIsInstance(pco_img, PCOImage)
         np.testing.assert_array_equal(pco_img.img, np.zeros((100, 100), dtype=np.uint16))
 
+    def test_bcd_decoding(self):
+        from pco_image.image import bcd2digits, get_stamp_from_16pixels
+        self.assertEqual(bcd2digits(0x23, shift2bits=False), '23')
+        self.assertEqual(bcd2digits(0x23 << 2, shift2bits=True), '23')
+        pixels = PCOImage.from_b16(__this_dir__ / 'Cam1_0001A.b16').get_pixels(14)
+        self.assertEqual(get_stamp_from_16pixels(pixels, shift2bits=True, return_raw=True),
+                         ('00000001', '20230120182153096318'))
+
+        from pco_image.image import get_stamps_from_pixels
+        idx, dtime, valid = get_stamps_from_pixels(np.stack([pixels, pixels + 0xF0]), shift2bits=True)
+        np.testing.assert_array_equal(valid, [True, False])
+        self.assertEqual(idx[0], 1)
+        self.assertEqual(dtime[0], np.datetime64('2023-01-20T18:21:53.096300'))
+
+    def test_decode_stamp_paths(self):
+        from pco_image import image
+        pixels = PCOImage.from_b16(__this_dir__ / 'Cam1_0001A.b16').get_pixels(14)
+
+        fields, n_digits = image._decode_stamp(pixels, True)
+        self.assertEqual(n_digits, 26)
+        self.assertEqual(list(fields), [1, 2023, 1, 20, 18, 21, 53, 963])
+        self.assertEqual(image._decode_stamp(pixels + 0xF0, True)[1], 1)  # invalid nibble
+
+        # runs the numba path in plain python if numba is not installed:
+        kernel = None if image._USE_NUMBA else image._decode_stamp
+        cases = ((pixels, (1, datetime.datetime(2023, 1, 20, 18, 21, 53, 96300))),  # valid
+                 (pixels + 0xF0, ValueError),  # invalid nibble
+                 (pixels[:11], ValueError))  # too few pixels
+        for case_pixels, expected in cases:
+            for use_numba in (False, True):
+                with mock.patch.object(image, '_USE_NUMBA', use_numba), \
+                        mock.patch.object(image, '_decode_stamp_jit', kernel or image._decode_stamp_jit):
+                    if expected is ValueError:
+                        with self.assertRaises(ValueError):
+                            image.get_stamp_from_16pixels(case_pixels, shift2bits=True)
+                    else:
+                        self.assertEqual(image.get_stamp_from_16pixels(case_pixels, shift2bits=True), expected)
+
+    def test_numba_fallback(self):
+        from pco_image import image
+        broken_numba = mock.Mock(njit=mock.Mock(side_effect=RuntimeError('compilation failed')))
+        for numba_module in (None, broken_numba):  # import fails, compilation fails
+            with mock.patch.dict('sys.modules', {'numba': numba_module}), \
+                    mock.patch.object(image, '_USE_NUMBA', True), \
+                    mock.patch.object(image, '_decode_stamp_jit', None):
+                pco_img = PCOImage.from_b16(__this_dir__ / 'Cam1_0001A.b16')
+                self.assertEqual(pco_img.get_timestamp(True), datetime.datetime(2023, 1, 20, 18, 21, 53, 96300))
+                self.assertFalse(image._USE_NUMBA)
+
     def test_tiff(self):
         pco_img = PCOImage.from_tiff(__this_dir__ / 'Cam1_1A_noshift.tiff')
         self.assertEqual(str(pco_img.get_timestamp(True)), '2023-02-15 08:52:01.122900')
@@ -38,6 +89,25 @@ class TestPCOImage(unittest.TestCase):
 
         (__this_dir__ / 'out.tiff').unlink()
 
+    def test_tiff_partial_reading(self):
+        from pco_image import image
+        if image.tifffile is None:
+            self.skipTest('tifffile not installed')
+        for filename in ('Cam0A.tiff', 'Cam1_1A_noshift.tiff'):
+            pco_img = PCOImage.from_tiff(__this_dir__ / filename)
+            np.testing.assert_array_equal(pco_img.get_pixels(14), pco_img.img.ravel()[:14])
+
+    def test_tiff_backends(self):
+        from pco_image import image
+        if image.tifffile is None:
+            self.skipTest('tifffile not installed')
+        self.addCleanup(setattr, PCOImage, 'TIFF_BACKEND', PCOImage.TIFF_BACKEND)
+        imgs = []
+        for backend in ('cv2', 'tifffile'):
+            PCOImage.TIFF_BACKEND = backend
+            imgs.append(PCOImage.from_tiff(__this_dir__ / 'Cam0A.tiff').img)
+        np.testing.assert_array_equal(imgs[0], imgs[1])
+
     def test_b16(self):
         pco_img = PCOImage.from_b16(__this_dir__ / 'Cam1_0001A.b16')
         self.assertEqual(str(pco_img.get_timestamp(True)), '2023-01-20 18:21:53.096300')
@@ -64,6 +134,16 @@ class TestPCOImage(unittest.TestCase):
 
         self.assertIsInstance(pco_img.img, np.ndarray)
 
+        from pco_tools import pco_reader
+        np.testing.assert_array_equal(pco_img.img, pco_reader.load(__this_dir__ / 'Cam1_0001A.b16'))
+
+        # the file is not kept open by the loaded image:
+        import shutil
+        shutil.copy(__this_dir__ / 'Cam1_0001A.b16', __this_dir__ / 'tmp.b16')
+        tmp_img = PCOImage(__this_dir__ / 'tmp.b16').img
+        (__this_dir__ / 'tmp.b16').unlink()
+        np.testing.assert_array_equal(tmp_img, pco_img.img)
+
     def test_other(self):
         pco_img = PCOImage.from_b16(__this_dir__ / 'Cam1_0001A.b16')
 
@@ -74,10 +154,29 @@ class TestPCOImage(unittest.TestCase):
         pco_img.img = pco_img.img / 4
         self.assertEqual(pco_img.img[0, 0], img_orig / 4)
 
+        self.assertIs(weakref.ref(pco_img)(), pco_img)
+
     def test_fails(self):
+        with self.assertRaises(FileNotFoundError):
+            PCOImage(__this_dir__ / 'not_existing.b16')
+        pco_img = PCOImage(str(__this_dir__ / 'not_existing.b16'), check_exists=False)
+        self.assertIsInstance(pco_img.filename, pathlib.Path)
+        with self.assertRaises(FileNotFoundError):
+            pco_img.get_timestamp()
+
         pco_img = PCOImage(__this_dir__ / 'Cam0A.tiff', n_pixels=5)
         with self.assertRaises(ValueError):
             pco_img.get_timestamp()
+        with self.assertRaises(ValueError):
+            pco_img.get_index()
+
+        # fails before reading any pixels:
+        pco_img = PCOImage(__this_dir__ / 'Cam1_0001A.b16', n_pixels=5)
+        with mock.patch.object(PCOImage, 'get_pixels', side_effect=AssertionError('pixels read')):
+            with self.assertRaises(ValueError):
+                pco_img.get_timestamp()
+            with self.assertRaises(ValueError):
+                pco_img.get_index()
 
         # in B there is no timestamp:
         pco_img = PCOImage(__this_dir__ / 'Cam0B.tiff')
@@ -153,6 +252,29 @@ class TestPCOImage(unittest.TestCase):
         self.assertIsInstance(div_img.img, np.ndarray)
         np.testing.assert_array_equal(div_img.img, pco_img.img / 2)
 
+    def test_inplace_operations(self):
+        pco_img = PCOImage.from_b16(__this_dir__ / 'Cam1_0001A.b16')
+        orig = pco_img.img.copy()
+
+        buffer = PCOImage.empty_like(pco_img)
+        self.assertEqual(buffer.img.shape, orig.shape)
+        self.assertEqual(buffer.img.dtype, orig.dtype)
+        buffer.img[:] = orig
+
+        buffer_array = buffer.img
+        buffer += 2
+        buffer *= pco_img
+        buffer -= 4
+        buffer /= 2
+        self.assertIs(buffer.img, buffer_array)
+        self.assertEqual(buffer.img.dtype, np.uint16)
+        np.testing.assert_array_equal(buffer.img, (((orig + 2) * orig - 4) / 2).astype(np.uint16))
+
+        pco_img += 1
+        np.testing.assert_array_equal(pco_img.img, orig + 1)
+        # the file is not altered:
+        np.testing.assert_array_equal(PCOImage.from_b16(__this_dir__ / 'Cam1_0001A.b16').img, orig)
+
     def test_multiple_timesteps(self):
         import shutil
         multiple_dir = pathlib.Path(__this_dir__ / 'multiple')
@@ -166,4 +288,26 @@ class TestPCOImage(unittest.TestCase):
         ts = get_timesteps(filenames)
         self.assertEqual(len(ts), 12)
         self.assertIsInstance(ts[0], datetime.datetime)
+        self.assertEqual(get_timesteps(filenames, workers=1), ts)
+        # any iterable of filenames, e.g. a generator:
+        self.assertEqual(sorted(get_timesteps(multiple_dir.glob('*.b16'))), sorted(ts))
+        ts_array = get_timesteps(filenames, as_array=True)
+        self.assertEqual(ts_array.dtype, np.dtype('datetime64[us]'))
+        self.assertEqual(ts_array.tolist(), ts)
+
+        from pco_image.image import iter_timesteps
+        self.assertEqual(list(iter_timesteps(filenames, prefetch=4)), ts)
+
+        from pco_image.image import get_stamps
+        stamps = get_stamps(filenames)
+        self.assertEqual(stamps.shape, (12,))
+        self.assertEqual(list(stamps['filename']), filenames)
+        np.testing.assert_array_equal(stamps['idx'], 1)
+        self.assertEqual(stamps['dtime'].astype(datetime.datetime).tolist(), ts)
+
+        from pco_image import cache
+        self.assertEqual(get_timesteps(filenames, use_cache=True), ts)
+        self.assertTrue((multiple_dir / cache.CACHE_FILENAME).exists())
+        self.assertEqual(len(cache.load_cache(multiple_dir)), 12)
+        self.assertEqual(get_timesteps(filenames, use_cache=True), ts)
         shutil.rmtree(multiple_dir)